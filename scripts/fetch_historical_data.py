@@ -8,76 +8,142 @@ Downloads all decade files (e.g., 1980-1989, 1990-1999, 2000-2009, etc.).
 Updated once per year by MeteoSwiss.
 """
 
-import requests
+import json
+import os
+import shutil
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 
-# MeteoSwiss STAC API endpoints
-STAC_API_BASE = "https://data.geo.admin.ch/api/stac/v1"
+from stac_client import SESSION, fetch_all_stations
+
+# MeteoSwiss STAC collection
 COLLECTION_ID = "ch.meteoschweiz.ogd-smn"
 
 # Output directory for downloaded files
 OUTPUT_DIR = Path("meteoswiss_data") / "historical"
 OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
 
-def fetch_all_stations():
-    """
-    Fetch all stations from the STAC API using pagination
-    Returns a list of all station features
-    """
-    all_features = []
-    url = f"{STAC_API_BASE}/search"
+# Manifest of downloaded files: "<station_id>/<asset_name>" -> {"etag", "size", "part_etag"}
+# Kept outside OUTPUT_DIR so it is not uploaded by `snow stage copy --recursive`
+MANIFEST_PATH = OUTPUT_DIR.parent / ".historical_manifest.json"
+MANIFEST_LOCK = threading.Lock()
 
-    # Initial request
-    payload = {
-        "collections": [COLLECTION_ID],
-        "limit": 100  # Max items per page
-    }
+# In-progress downloads (<station_id>/<name>.part), also outside OUTPUT_DIR for the same reason
+PARTIAL_DIR = OUTPUT_DIR.parent / ".historical_partial"
 
-    print(f"Fetching stations from {COLLECTION_ID}...")
+# Number of stations downloaded concurrently (downloads are I/O bound)
+MAX_WORKERS = 10
 
-    while True:
-        response = requests.post(url, json=payload)
+# Flush buffered progress output every N completed stations
+PROGRESS_FLUSH_EVERY = 10
+
+def load_manifest():
+    """Load the download manifest, empty if it does not exist yet"""
+    try:
+        with open(MANIFEST_PATH, encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+def update_manifest(manifest, key, entry):
+    """Set a manifest entry in memory; persisted by save_manifest"""
+    with MANIFEST_LOCK:
+        manifest[key] = entry
+
+def save_manifest(manifest):
+    """Persist the manifest atomically (temp file + os.replace)"""
+    with MANIFEST_LOCK:
+        tmp_path = MANIFEST_PATH.with_suffix('.json.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(manifest, f)
+        os.replace(tmp_path, MANIFEST_PATH)
+
+def fetch_remote_metadata(url):
+    """
+    Fetch ETag and unencoded size of a remote file with a HEAD request
+    Returns (None, None) if the request fails
+    """
+    try:
+        response = SESSION.head(url, headers={'Accept-Encoding': 'identity'}, allow_redirects=True, timeout=30)
         response.raise_for_status()
-        data = response.json()
+        size = response.headers.get('Content-Length')
+        return response.headers.get('ETag'), int(size) if size else None
+    except Exception:
+        return None, None
+
+def is_up_to_date(output_path, entry, etag, size):
+    """Check whether a local file is complete and matches the current remote version"""
+    if not output_path.exists():
+        return False
 
-        features = data.get('features', [])
-        all_features.extend(features)
+    local_size = output_path.stat().st_size
 
-        print(f"  Fetched {len(features)} stations (total: {len(all_features)})")
+    if 'etag' in entry:
+        # If the HEAD request failed, trust the manifest
+        return (etag is None or entry['etag'] == etag) and entry.get('size') == local_size
 
-        # Check for next page
-        links = data.get('links', [])
-        next_link = next((link for link in links if link.get('rel') == 'next'), None)
+    # File downloaded before the manifest existed: accept it only if it is not truncated
+    return size is not None and size == local_size
 
-        if not next_link:
-            break
+def get_part_path(output_path):
+    """Path of the in-progress download for output_path (mirrors the station layout in PARTIAL_DIR)"""
+    return PARTIAL_DIR / output_path.parent.name / (output_path.name + '.part')
 
-        # Update payload with cursor for next page
-        cursor = next_link.get('body', {}).get('cursor')
-        if cursor:
-            payload['cursor'] = cursor
-        else:
-            break
+def download_csv(url, output_path, if_range=None, expected_size=None):
+    """
+    Stream a CSV file from URL to output_path in 1 MiB chunks
 
-    return all_features
+    Data is written to PARTIAL_DIR/<station_id>/<name>.part and only moved to output_path once complete.
+    A .part file left behind by an interrupted run is resumed with an HTTP Range request,
+    guarded by If-Range so the server sends the full file if it changed in the meantime.
+    If expected_size is known, a body that ended early is rejected and kept as .part.
 
-def download_csv(url, output_path):
-    """Download a CSV file from URL to output_path"""
+    Returns None on success, or the error message so the caller can report it
+    in the station's output block.
+    """
+    part_path = get_part_path(output_path)
+    part_path.parent.mkdir(parents=True, exist_ok=True)
     try:
-        response = requests.get(url, timeout=30)
-        response.raise_for_status()
-
-        with open(output_path, 'wb') as f:
-            f.write(response.content)
-
-        return True
+        headers = {}
+        if part_path.exists() and if_range:
+            # Ranges refer to raw bytes, so ask for an unencoded response when resuming
+            headers = {
+                'Range': f'bytes={part_path.stat().st_size}-',
+                'If-Range': if_range,
+                'Accept-Encoding': 'identity'
+            }
+
+        with SESSION.get(url, headers=headers, stream=True, timeout=30) as response:
+            # Range not satisfiable: the previous run already received the whole file
+            if not (headers and response.status_code == 416):
+                response.raise_for_status()
+                response.raw.decode_content = True
+
+                # 206 continues the partial file, 200 means the server sent the full file
+                mode = 'ab' if response.status_code == 206 else 'wb'
+                with open(part_path, mode, buffering=1024 * 1024) as f:
+                    shutil.copyfileobj(response.raw, f, length=1024 * 1024)
+
+        received = part_path.stat().st_size
+        if expected_size is not None and received != expected_size:
+            return f"incomplete download ({received} of {expected_size} bytes)"
+
+        part_path.replace(output_path)
+        return None
     except Exception as e:
-        print(f"      Error: {e}")
-        return False
+        return str(e)
 
-def download_station_data(station_id, assets):
+def download_station_data(station_id, assets, manifest):
     """
     Download ALL 10-minute historical data (_t_historical_*.csv) files for a station
+
+    Files whose ETag and size match the manifest are skipped; changed or truncated
+    files are downloaded again.
+
+    Runs in a worker thread, so progress lines are collected and returned with the
+    download count; the caller prints them as one block per station.
     """
     # Filter for _t_historical_*.csv files only
     historical_assets = {
@@ -86,15 +152,14 @@ def download_station_data(station_id, assets):
     }
 
     if not historical_assets:
-        print(f"  No _t_historical files available for {station_id}")
-        return 0
+        return 0, [f"  No _t_historical files available for {station_id}"]
 
     # Create station directory
     station_dir = OUTPUT_DIR / station_id
     station_dir.mkdir(exist_ok=True)
 
     downloaded = 0
-    print(f"  Station {station_id.upper()}: {len(historical_assets)} historical files")
+    lines = [f"  Station {station_id.upper()}: {len(historical_assets)} historical files"]
 
     # Download all historical files
     for asset_name, asset_info in historical_assets.items():
@@ -103,24 +168,39 @@ def download_station_data(station_id, assets):
             continue
 
         output_path = station_dir / asset_name
-
-        # Skip if already downloaded
-        if output_path.exists():
-            print(f"    ✓ {asset_name} (already exists)")
+        key = f"{station_id}/{asset_name}"
+        entry = manifest.get(key, {})
+        etag, size = fetch_remote_metadata(url)
+
+        # Skip if already downloaded and unchanged upstream
+        if is_up_to_date(output_path, entry, etag, size):
+            if 'etag' not in entry:
+                update_manifest(manifest, key, {'etag': etag, 'size': size})
+            # A .part from an abandoned re-download is no longer needed
+            get_part_path(output_path).unlink(missing_ok=True)
+            lines.append(f"    ✓ {asset_name} (up to date)")
             downloaded += 1
             continue
 
-        print(f"    ↓ {asset_name}...", end='')
+        # Remember which version the .part file belongs to, so a later run can resume it.
+        # The previous etag/size are kept so an interrupted re-download still counts as stale.
+        update_manifest(manifest, key, {**entry, 'part_etag': etag})
 
-        if download_csv(url, output_path):
-            print(" ✓")
+        error = download_csv(url, output_path, if_range=entry.get('part_etag'), expected_size=size)
+        if error is None:
+            update_manifest(manifest, key, {'etag': etag, 'size': output_path.stat().st_size})
+            lines.append(f"    ✓ {asset_name}")
             downloaded += 1
         else:
-            print(" ✗")
+            lines.append(f"    ✗ {asset_name}")
+            lines.append(f"      Error: {error}")
 
-    return downloaded
+    return downloaded, lines
 
 def main():
+    # Block-buffer progress output (one write per flush instead of per line on a terminal)
+    sys.stdout.reconfigure(line_buffering=False)
+
     print("=" * 70)
     print("MeteoSwiss Historical Data Downloader")
     print("Downloading ALL 10-minute historical files per station")
@@ -130,29 +210,52 @@ def main():
     print()
 
     # Fetch all stations
-    stations = fetch_all_stations()
+    stations = fetch_all_stations(COLLECTION_ID)
     print(f"\nTotal stations found: {len(stations)}")
     print("=" * 70)
     print()
 
-    # Download data for each station
+    # Show the banner and station listing now; only per-station progress is block-buffered
+    sys.stdout.flush()
+
+    # Download data for all stations concurrently
+    manifest = load_manifest()
     total_files = 0
     stations_with_data = 0
 
-    for idx, station in enumerate(stations, 1):
-        station_id = station.get('id')
-        station_title = station.get('properties', {}).get('title', 'N/A')
-        assets = station.get('assets', {})
-
-        print(f"[{idx}/{len(stations)}] {station_title}")
-
-        files_downloaded = download_station_data(station_id, assets)
-
-        if files_downloaded > 0:
-            stations_with_data += 1
-            total_files += files_downloaded
-
-        print()
+    try:
+        with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+            futures = {
+                executor.submit(download_station_data, station.get('id'), station.get('assets', {}), manifest): station
+                for station in stations
+            }
+
+            try:
+                for idx, future in enumerate(as_completed(futures), 1):
+                    station = futures[future]
+                    station_title = station.get('properties', {}).get('title', 'N/A')
+
+                    files_downloaded, lines = future.result()
+
+                    if files_downloaded > 0:
+                        stations_with_data += 1
+                        total_files += files_downloaded
+
+                    # One write per station keeps concurrent output grouped
+                    print("\n".join([f"[{idx}/{len(stations)}] {station_title}", *lines, ""]))
+
+                    # Persist once per finished station rather than per file
+                    save_manifest(manifest)
+
+                    if idx % PROGRESS_FLUSH_EVERY == 0:
+                        sys.stdout.flush()
+            except KeyboardInterrupt:
+                # Drop queued stations instead of draining them; in-flight files resume next run
+                executor.shutdown(wait=False, cancel_futures=True)
+                raise
+    finally:
+        # Runs after in-flight downloads finish, also on Ctrl+C, so .part files stay resumable
+        save_manifest(manifest)
 
     # Summary
     print("=" * 70)
@@ -0,0 +1,108 @@
+"""
+Shared MeteoSwiss STAC API client for the fetch scripts
+
+Provides a pooled HTTP session and a station listing that is cached on disk,
+so scripts run back-to-back do not re-paginate the same collection.
+"""
+
+import json
+import os
+import requests
+from datetime import datetime, timedelta
+from pathlib import Path
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# MeteoSwiss STAC API endpoint
+STAC_API_BASE = "https://data.geo.admin.ch/api/stac/v1"
+
+# Station listings are cached here and reused while younger than CACHE_TTL
+CACHE_DIR = Path("meteoswiss_data")
+CACHE_TTL = timedelta(hours=1)
+
+# Shared HTTP session: keep-alive connections are reused across all STAC and CSV requests.
+# Retries back off on rate limiting (429, honouring Retry-After) and transient server errors.
+SESSION = requests.Session()
+SESSION.mount("https://", HTTPAdapter(
+    pool_connections=16,
+    pool_maxsize=32,
+    max_retries=Retry(
+        total=3,
+        backoff_factor=0.5,
+        status_forcelist=[429, 500, 502, 503, 504],
+        allowed_methods=["GET", "HEAD", "POST"]
+    )
+))
+
+def compact_feature(feature):
+    """
+    Keep only the station fields used downstream (id, title, asset hrefs)
+    so the full STAC feature (geometry, links, asset metadata) is not retained
+    """
+    properties = feature.get('properties', {})
+    return {
+        'id': feature.get('id'),
+        'properties': {'title': properties['title']} if 'title' in properties else {},
+        'assets': {name: {'href': asset.get('href')} for name, asset in feature.get('assets', {}).items()}
+    }
+
+def fetch_all_stations(collection_id, cache_ttl=CACHE_TTL):
+    """
+    Fetch all stations of a collection from the STAC API using pagination
+    Returns a list of all station features
+
+    The result is cached on disk; a cache younger than cache_ttl is returned
+    without querying the API.
+    """
+    cache_path = CACHE_DIR / f".stac_cache_{collection_id}.json"
+    if cache_path.exists():
+        age = datetime.now() - datetime.fromtimestamp(cache_path.stat().st_mtime)
+        if age < cache_ttl:
+            with open(cache_path, encoding='utf-8') as f:
+                all_features = json.load(f)
+            print(f"Using cached station list for {collection_id} ({len(all_features)} stations)")
+            return all_features
+
+    all_features = []
+    url = f"{STAC_API_BASE}/search"
+
+    # Initial request
+    payload = {
+        "collections": [collection_id],
+        "limit": 100  # Max items per page
+    }
+
+    print(f"Fetching stations from {collection_id}...")
+
+    while True:
+        response = SESSION.post(url, json=payload, timeout=60)
+        response.raise_for_status()
+        data = response.json()
+
+        features = data.get('features', [])
+        all_features.extend(compact_feature(feature) for feature in features)
+
+        print(f"  Fetched {len(features)} stations (total: {len(all_features)})")
+
+        # Check for next page
+        links = data.get('links', [])
+        next_link = next((link for link in links if link.get('rel') == 'next'), None)
+
+        if not next_link:
+            break
+
+        # Update payload with cursor for next page
+        cursor = next_link.get('body', {}).get('cursor')
+        if cursor:
+            payload['cursor'] = cursor
+        else:
+            break
+
+    # Write the cache atomically so concurrent runs never read a partial file
+    CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    tmp_path = cache_path.with_suffix('.json.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(all_features, f)
+    os.replace(tmp_path, cache_path)
+
+    return all_features
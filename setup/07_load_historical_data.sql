@@ -127,7 +127,10 @@ COMMENT ON COLUMN bronze.t_weather_measurements_10min_historical.file_name IS 'S
 -- Install Snowflake CLI and configure connection
 -- From Snowflake CLI, cd to the root folder of the project and run:
 --
--- snow stage copy ./meteoswiss_data/historical/ @bronze.stg_meteoswiss_historical --recursive
+-- snow stage copy ./meteoswiss_data/historical/ @bronze.stg_meteoswiss_historical --recursive --auto-compress --parallel 8
+--
+-- --auto-compress gzips each CSV client-side (numeric CSVs shrink ~5-10x), which cuts upload
+-- time accordingly. Files are staged as *.csv.gz and decompressed automatically by COPY INTO.
 --
 -- After upload completes, verify files are uploaded:
 LIST @bronze.stg_meteoswiss_historical;
@@ -176,7 +179,7 @@ FROM (
         SYSDATE() as loaded_at
     FROM @bronze.stg_meteoswiss_historical
 )
-PATTERN = '.*t_historical_.*\\.csv'
+PATTERN = '.*t_historical_.*\\.csv(\\.gz)?'
 ON_ERROR = ABORT_STATEMENT
 FORCE = FALSE;
 
@@ -9,7 +9,7 @@
 -- - Delimiter: Semicolon (;)
 -- - Encoding: UTF-8
 -- - Header: First row contains column names (skip it during load)
--- - Compression: None (files are not compressed)
+-- - Compression: AUTO (plain CSV, or gzip when uploaded with auto-compress)
 -- - Null handling: Empty strings, 'NULL', and '-' treated as NULL
 -- ============================================================================
 
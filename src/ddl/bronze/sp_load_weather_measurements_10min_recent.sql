@@ -30,7 +30,12 @@ $$
 import requests
 import json
 import logging
-from io import BytesIO
+import os
+import shutil
+import tempfile
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from snowflake.snowpark import Session
 from snowflake.snowpark.files import SnowflakeFile
 
@@ -40,8 +45,40 @@ logger = logging.getLogger("meteoswiss.bronze.recent_data")
 # MeteoSwiss STAC API configuration
 STAC_API_BASE = "https://data.geo.admin.ch/api/stac/v1"
 COLLECTION_ID = "ch.meteoschweiz.ogd-smn"
+ASSET_PREFIX = "ogd-smn"  # Station assets are named <prefix>_<station_id>_t_<tier>.csv
 STAGE_PATH = "@bronze.stg_meteoswiss_recent"
 
+# Number of concurrent HTTP downloads
+MAX_WORKERS = 10
+
+# Number of threads used by the single PUT that uploads all downloaded files
+PUT_PARALLEL = 8
+
+# Shared HTTP session: keep-alive connections are reused across all STAC and CSV requests
+SESSION = requests.Session()
+SESSION.mount("https://", HTTPAdapter(
+    pool_connections=16,
+    pool_maxsize=32,
+    max_retries=Retry(
+        total=3,
+        backoff_factor=0.5,
+        status_forcelist=[429, 500, 502, 503, 504],
+        allowed_methods=["GET", "HEAD", "POST"]
+    )
+))
+
+def compact_feature(feature):
+    """
+    Keep only the station fields used downstream (id, title, asset hrefs)
+    so the full STAC feature (geometry, links, asset metadata) is not retained
+    """
+    properties = feature.get('properties', {})
+    return {
+        'id': feature.get('id'),
+        'properties': {'title': properties['title']} if 'title' in properties else {},
+        'assets': {name: {'href': asset.get('href')} for name, asset in feature.get('assets', {}).items()}
+    }
+
 def fetch_all_stations():
     """
     Fetch all stations from STAC API using pagination
@@ -55,12 +92,12 @@ def fetch_all_stations():
     }
 
     while True:
-        response = requests.post(url, json=payload, timeout=60)
+        response = SESSION.post(url, json=payload, timeout=60)
         response.raise_for_status()
         data = response.json()
 
         features = data.get('features', [])
-        all_features.extend(features)
+        all_features.extend(compact_feature(feature) for feature in features)
 
         # Check for next page
         links = data.get('links', [])
@@ -77,29 +114,27 @@ def fetch_all_stations():
 
     return all_features
 
-def download_and_upload_file(session, station_id, url, filename):
+def download_file(url, output_path):
     """
-    Download CSV file and upload to Snowflake stage
+    Stream CSV file to a local path without buffering the body, returns False on failure
+
+    Data is written to <name>.part and only renamed to output_path once complete,
+    so a failed download never leaves a truncated *.csv behind for the PUT.
     """
+    part_path = output_path + ".part"
     try:
-        # Download file
-        response = requests.get(url, timeout=60)
-        response.raise_for_status()
+        with SESSION.get(url, stream=True, timeout=60) as response:
+            response.raise_for_status()
+            response.raw.decode_content = True
 
-        # Create file stream
-        file_stream = BytesIO(response.content)
-
-        # Upload to stage using put_stream
-        stage_location = f"{STAGE_PATH}/{station_id}/{filename}"
-        session.file.put_stream(
-            input_stream=file_stream,
-            stage_location=stage_location,
-            auto_compress=False,
-            overwrite=True
-        )
+            with open(part_path, 'wb', buffering=1024 * 1024) as f:
+                shutil.copyfileobj(response.raw, f, length=1024 * 1024)
 
+        os.replace(part_path, output_path)
         return True
     except Exception as e:
+        if os.path.exists(part_path):
+            os.remove(part_path)
         return False
 
 def main(session: Session) -> dict:
@@ -140,43 +175,76 @@ def main(session: Session) -> dict:
             "stations_total": len(stations)
         })
 
-        # Step 3: Download and upload files
-        logger.info("Starting file download and upload to stage")
+        # Step 3: Download files concurrently into a local temp directory
+        logger.info("Starting file download")
+        recent_files = []
         for station in stations:
             station_id = station.get('id')
             assets = station.get('assets', {})
 
-            # Find _t_recent.csv file
-            recent_file = None
-            for name, asset in assets.items():
-                if name.endswith('_t_recent.csv'):
-                    recent_file = (name, asset.get('href'))
-                    break
-
-            if not recent_file:
-                continue
-
-            filename, url = recent_file
-
-            # Download and upload
-            if download_and_upload_file(session, station_id, url, filename):
-                stats["files_uploaded"] += 1
-                stats["stations_processed"] += 1
-
-                # Log progress every 20 files
-                if stats["files_uploaded"] % 20 == 0:
-                    logger.info(f"Progress: {stats['files_uploaded']} files uploaded", extra={
-                        "files_uploaded": stats["files_uploaded"],
-                        "stations_processed": stats["stations_processed"]
-                    })
-            else:
-                stats["files_failed"] += 1
-                error_msg = f"Failed to upload {filename} for station {station_id}"
-                stats["errors"].append(error_msg)
-                logger.warning(error_msg, extra={
-                    "station_id": station_id,
-                    "filename": filename
-                })
+            # Find _t_recent.csv file: direct lookup by its deterministic asset key,
+            # linear scan only as a fallback for naming exceptions
+            name = f"{ASSET_PREFIX}_{station_id}_t_recent.csv"
+            asset = assets.get(name)
+            if asset is None:
+                name, asset = next(
+                    ((n, a) for n, a in assets.items() if n.endswith('_t_recent.csv')),
+                    (None, None)
+                )
+
+            if asset is not None:
+                recent_files.append((station_id, name, asset.get('href')))
+
+        download_dir = tempfile.mkdtemp(prefix="meteoswiss_recent_")
+        try:
+            with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+                futures = {
+                    executor.submit(download_file, url, os.path.join(download_dir, filename)): (station_id, filename)
+                    for station_id, filename, url in recent_files
+                }
+
+                for future in as_completed(futures):
+                    station_id, filename = futures[future]
+
+                    if future.result():
+                        stats["stations_processed"] += 1
+
+                        # Log progress every 20 files
+                        if stats["stations_processed"] % 20 == 0:
+                            logger.info(f"Progress: {stats['stations_processed']} files downloaded", extra={
+                                "stations_processed": stats["stations_processed"]
+                            })
+                    else:
+                        stats["files_failed"] += 1
+                        error_msg = f"Failed to download {filename} for station {station_id}"
+                        stats["errors"].append(error_msg)
+                        logger.warning(error_msg, extra={
+                            "station_id": station_id,
+                            "filename": filename
+                        })
+
+            # Upload all downloaded files with a single parallel PUT (one stage round-trip)
+            put_results = []
+            if stats["stations_processed"] > 0:
+                logger.info("Uploading downloaded files to stage")
+                put_results = session.file.put(
+                    os.path.join(download_dir, "*.csv"),
+                    STAGE_PATH,
+                    parallel=PUT_PARALLEL,
+                    auto_compress=False,
+                    overwrite=True
+                )
+
+            for result in put_results:
+                if result.status == "UPLOADED":
+                    stats["files_uploaded"] += 1
+                else:
+                    stats["files_failed"] += 1
+                    error_msg = f"Failed to upload {result.source}: {result.status} {result.message}"
+                    stats["errors"].append(error_msg)
+                    logger.warning(error_msg, extra={"filename": result.source})
+        finally:
+            shutil.rmtree(download_dir, ignore_errors=True)
 
         logger.info(f"File upload completed: {stats['files_uploaded']} uploaded, {stats['files_failed']} failed", extra={
             "files_uploaded": stats["files_uploaded"],